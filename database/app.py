@@ -1,12 +1,15 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
-import pandas as pd
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Query
 from rich.logging import RichHandler
-from sqlalchemy import and_, func, or_, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (Date, DateTime, String, and_, bindparam, case, cast,
+                        func, or_, select, true)
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import selectinload
 from yelp_db.yelp_db.connect import db
 from yelp_db.yelp_db.model import (Business, BusinessFoodCategory,
                                    FoodCategory, OpenHours, Weekday)
@@ -17,38 +20,91 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+async def load_weekday_mapping(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> dict[str, int]:
+    async with session_factory() as session:
+        result = await session.execute(select(Weekday.name, Weekday.id))
+        return dict(result.all())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up the connection pool and cache weekday name -> id mapping,
+    since weekdays never change
+    """
+    await db.warm_up()
+    app.state.weekday_mapping = await load_weekday_mapping(db.async_session)
+    yield
+    await db.engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 LA_TZ = ZoneInfo("America/Los_Angeles")
 WEEKDAY_ORDER = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+BUSINESS_LOAD_OPTIONS = (
+    selectinload(Business.open_hours),
+    selectinload(Business.food_categories),
+)
 
 
 async def get_db():
-    await db.connect()
-    try:
-        yield db.session
-    finally:
-        await db.disconnect()
+    """
+    Provide the session factory instead of a single session, so that handlers
+    can run independent queries concurrently on separate pooled connections.
+    """
+    yield db.async_session
 
 db_dependency = Depends(get_db)
 
 
-async def select_to_df(stmt, session: AsyncSession) -> pd.DataFrame:
-    """ Execute statement and return pandas dataframe """
+async def execute_rows(stmt, session: AsyncSession) -> list[dict]:
+    """ Execute statement and return rows as dicts """
     try:
         res = await session.execute(stmt)
-        result = list(res)
-        return pd.DataFrame.from_records(result, columns=res.keys())
+        return [dict(row._mapping) for row in res]
     except Exception as e:
         logger.error(e)
         await session.rollback()
+        raise
+
+
+def get_next_cursor(rows: list[dict], has_more: bool) -> int | None:
+    """ Id of the last business on the page, to be passed as last_id for the next page """
+    return rows[-1]["Business"].id if has_more else None
+
+
+def split_page(rows: list[dict], page_size: int) -> tuple[list[dict], bool]:
+    """ Pages are fetched with one extra row, which tells whether there is a next page """
+    return rows[:page_size], len(rows) > page_size
+
+
+def after_cursor(last_id: int | None):
+    """ Keyset pagination filter, uses the primary key index regardless of page depth """
+    return Business.id > last_id if last_id is not None else true()
+
+
+async def fetch_page(
+    count_stmt,
+    stmt,
+    session_factory: async_sessionmaker[AsyncSession],
+) -> tuple[int, list[dict]]:
+    """ Execute count and page statements concurrently on separate sessions """
+    async with session_factory() as count_session, session_factory() as page_session:
+        return await asyncio.gather(
+            count_session.scalar(count_stmt),
+            execute_rows(stmt, page_session),
+        )
 
 
 @app.get("/restaurants/category/{category}")
 async def get_restaurants_by_category(
     category: int | str,
-    page: int = 1,
-    page_size: int = 10,
-    session: AsyncSession = db_dependency,
+    last_id: int | None = None,
+    page_size: int = Query(10, gt=0),
+    session_factory: async_sessionmaker[AsyncSession] = db_dependency,
 ):
     """
     Get restaurants by food category with pagination.
@@ -58,43 +114,39 @@ async def get_restaurants_by_category(
         category_id = int(category)
     else:
         category_query = select(FoodCategory.id).where(FoodCategory.name.ilike(category))
-        category_result = await session.execute(category_query)
-        category_id = category_result.scalar()
+        async with session_factory() as session:
+            category_id = await session.scalar(category_query)
         if not category_id:
             return {"error": "Category not found"}
 
     total_count_query = (
-        select(func.count()).select_from(Business)
-        .join(BusinessFoodCategory, Business.id == BusinessFoodCategory.business_id)
+        select(func.count()).select_from(BusinessFoodCategory)
         .where(BusinessFoodCategory.food_category_id == category_id))
 
-    total_count_result = await session.execute(total_count_query)
-    total_count = total_count_result.scalar()
-
-    offset = (page - 1) * page_size
-
     query = (
         select(Business)
+        .options(*BUSINESS_LOAD_OPTIONS)
         .join(BusinessFoodCategory, Business.id == BusinessFoodCategory.business_id)
-        .where(BusinessFoodCategory.food_category_id == category_id)
-        .limit(page_size)
-        .offset(offset)
+        .where(BusinessFoodCategory.food_category_id == category_id, after_cursor(last_id))
+        .order_by(Business.id)
+        .limit(page_size + 1)
     )
-    data = await select_to_df(query, session)
+    total_count, rows = await fetch_page(total_count_query, query, session_factory)
+    rows, has_more = split_page(rows, page_size)
     return {
-        "page": page,
+        "next_cursor": get_next_cursor(rows, has_more),
         "page_size": page_size,
         "total_results": total_count,
-        "businesses": data.to_dict(orient="records"),
+        "businesses": rows,
     }
 
 
 @app.get("/restaurants/day/{weekday}")
 async def get_restaurants_by_day(
     weekday: str | int,
-    page: int = 1,
-    page_size: int = 10,
-    session: AsyncSession = db_dependency,
+    last_id: int | None = None,
+    page_size: int = Query(10, gt=0),
+    session_factory: async_sessionmaker[AsyncSession] = db_dependency,
 ):
     """
     Get restaurants open on a specific day with pagination.
@@ -105,74 +157,76 @@ async def get_restaurants_by_day(
         weekday_id = int(weekday)
     else:
         weekday_query = select(Weekday.id).where(Weekday.name.ilike(weekday))
-        weekday_result = await session.execute(weekday_query)
-        weekday_id = weekday_result.scalar()
+        async with session_factory() as session:
+            weekday_id = await session.scalar(weekday_query)
 
         if not weekday_id:
             return {"error": "Invalid weekday"}
 
+    # a business can have several time ranges on the same day, so it has to be
+    # counted and paginated once, otherwise the keyset cursor would skip rows
     total_count_query = (
-        select(func.count())
-        .select_from(Business)
-        .join(OpenHours, Business.id == OpenHours.business_id)
+        select(func.count(OpenHours.business_id.distinct()))
         .where(OpenHours.weekday_id == weekday_id)
     )
-    total_count_result = await session.execute(total_count_query)
-    total_count = total_count_result.scalar()
-
-    offset = (page - 1) * page_size
 
+    open_on_weekday = select(OpenHours.business_id).where(OpenHours.weekday_id == weekday_id)
     query = (
         select(Business)
-        .join(OpenHours, Business.id == OpenHours.business_id)
-        .where(OpenHours.weekday_id == weekday_id)
-        .limit(page_size)
-        .offset(offset)
+        .options(*BUSINESS_LOAD_OPTIONS)
+        .where(Business.id.in_(open_on_weekday), after_cursor(last_id))
+        .order_by(Business.id)
+        .limit(page_size + 1)
     )
 
-    data = await select_to_df(query, session)
+    total_count, rows = await fetch_page(total_count_query, query, session_factory)
+    rows, has_more = split_page(rows, page_size)
 
     return {
         "weekday": weekday,
-        "page": page,
+        "next_cursor": get_next_cursor(rows, has_more),
         "page_size": page_size,
         "total_results": total_count,
-        "restaurants": data.to_dict(orient="records"),
+        "restaurants": rows,
     }
 
 
-async def get_current_weekday_ids(session: AsyncSession) -> tuple[int]:
+async def get_current_weekday_ids(
+    now_dt: datetime,
+    session_factory: async_sessionmaker[AsyncSession],
+) -> tuple[int]:
     """
-    Returns the correct current and previous weekday IDs based on database weekday names.
+    Returns the correct current and previous weekday IDs based on database weekday names
+    cached at startup. The cache is reloaded if a weekday is missing from it, since
+    the API may have been started before the data was uploaded.
     """
-    result = await session.execute(select(Weekday.name, Weekday.id))
-    weekday_records = result.fetchall()
-    weekday_mapping = dict(weekday_records)
-    today_name = datetime.now(LA_TZ).strftime("%a")
+    today_name = WEEKDAY_ORDER[now_dt.weekday()]
 
-    today_id = weekday_mapping.get(today_name)
-    if today_id is None:
-        raise ValueError(f"Weekday {today_name} not found in the database!")
+    previous_name = WEEKDAY_ORDER[now_dt.weekday() - 1]
 
-    sorted_weekdays = sorted(weekday_mapping.keys(), key=lambda x: WEEKDAY_ORDER.index(x))
-    today_index = sorted_weekdays.index(today_name)
-    previous_name = sorted_weekdays[today_index - 1]
-    previous_id = weekday_mapping[previous_name]
+    if not {today_name, previous_name} <= app.state.weekday_mapping.keys():
+        app.state.weekday_mapping = await load_weekday_mapping(session_factory)
+    weekday_mapping = app.state.weekday_mapping
 
-    return today_id, previous_id
+    for name in (today_name, previous_name):
+        if name not in weekday_mapping:
+            raise ValueError(f"Weekday {name} not found in the database!")
+
+    return weekday_mapping[today_name], weekday_mapping[previous_name]
 
 
 @app.get("/restaurants/now")
 async def get_restaurants_open_now(
-    session: AsyncSession = db_dependency,
-    page: int = 1,
-    page_size: int = 10,
+    session_factory: async_sessionmaker[AsyncSession] = db_dependency,
+    last_id: int | None = None,
+    page_size: int = Query(10, gt=0),
 ):
     """
     Get restaurants currently opened and time until close with pagination.
     """
-    now = datetime.now(LA_TZ).time()
-    current_weekday, previous_weekday = await get_current_weekday_ids(session)
+    now_dt = datetime.now(LA_TZ)
+    now = now_dt.time()
+    current_weekday, previous_weekday = await get_current_weekday_ids(now_dt, session_factory)
 
     open_now_filter = or_(
         and_(  # normal case
@@ -192,42 +246,33 @@ async def get_restaurants_open_now(
         ),
     )
 
-    total_count_query = select(func.count()).select_from(
-        select(Business.id)
-        .join(OpenHours, Business.id == OpenHours.business_id)
-        .where(open_now_filter),
+    # close time falls on the next day if it is earlier than now (overnight case)
+    close_datetime = (
+        bindparam("today", now_dt.date(), type_=Date)
+        + OpenHours.close_time
+        + case((OpenHours.close_time < now, timedelta(days=1)), else_=timedelta(0))
     )
-    total_count_result = await session.execute(total_count_query)
-    total_count = total_count_result.scalar()
+    time_until_close = cast(
+        close_datetime - bindparam("now_ts", now_dt.replace(tzinfo=None), type_=DateTime),
+        String,
+    ).label("time_until_close")
 
-    offset = (page - 1) * page_size
     query = (
-        select(Business, OpenHours.close_time)
+        select(Business, OpenHours.close_time, time_until_close)
+        .options(*BUSINESS_LOAD_OPTIONS)
         .join(OpenHours, Business.id == OpenHours.business_id)
-        .where(open_now_filter)
-        .limit(page_size)
-        .offset(offset)
+        .where(open_now_filter, after_cursor(last_id))
+        .order_by(Business.id)
+        .limit(page_size + 1)  # one extra row tells whether there is a next page
     )
 
-    data = await select_to_df(query, session)
-
-    if not data.empty:
-        today = datetime.now(LA_TZ).date()
-
-        def calculate_time_until_close(close_time):
-            """Adjusts close time if it's overnight"""
-            close_datetime = datetime.combine(today, close_time, LA_TZ)
-
-            if close_time < now:
-                close_datetime += timedelta(days=1)
-
-            return str(close_datetime - datetime.now(LA_TZ))
-
-        data["time_until_close"] = data["close_time"].apply(calculate_time_until_close)
+    async with session_factory() as session:
+        rows = await execute_rows(query, session)
+    rows, has_more = split_page(rows, page_size)
 
     return {
-        "page": page,
+        "next_cursor": get_next_cursor(rows, has_more),
         "page_size": page_size,
-        "total_results": total_count,
-        "restaurants": data.to_dict(orient="records"),
+        "has_more": has_more,
+        "restaurants": rows,
     }
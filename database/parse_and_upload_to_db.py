@@ -1,14 +1,18 @@
 import argparse
 import asyncio
-import json
+import functools
 import logging
 import re
-from datetime import datetime, time
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import time
+from itertools import islice
 from pathlib import Path
 from typing import Any
 
+import orjson
 from rich.logging import RichHandler
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from yelp_db.yelp_db.connect import db
 from yelp_db.yelp_db.model import (Amenity, Business, BusinessAmenity,
@@ -22,37 +26,102 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+LOOKUP_MODELS = (Weekday, FoodCategory, SearchTerm, Highlight, Amenity)
+CHUNK_SIZE = 1000
+HOURS_RE = re.compile(r"(\d{1,2}:\d{2} [AP]M) - (\d{1,2}:\d{2} [AP]M)")
 
-def load_data(file_path: Path) -> list:
-    with file_path.open() as f:
-        return [json.loads(line) for line in f]
 
+def batched(iterable: Iterable, n: int) -> Iterator[tuple]:
+    """ Same as itertools.batched, which needs Python 3.12+ """
+    iterator = iter(iterable)
+    while chunk := tuple(islice(iterator, n)):
+        yield chunk
 
-async def get_or_create(
-    session: AsyncSession,
-    model: Any,
-    **kwargs,
-) -> Any:
-    """Get an existing record or create a new one."""
-    stmt = select(model).filter_by(**kwargs)
-    result = await session.execute(stmt)
-    instance = result.scalar_one_or_none()
 
-    if instance:
-        return instance
+def iter_data(file_path: Path) -> Iterator[dict]:
+    """Lazily parse NDJSON file line by line."""
+    with file_path.open("rb") as f:
+        for line in f:
+            yield orjson.loads(line)
+
+
+def collect_lookup_names(data: Iterable[dict]) -> dict[Any, set[str]]:
+    """Collect names referenced in the data for every lookup table."""
+    names = {model: set() for model in LOOKUP_MODELS}
+    for business_data in data:
+        names[Weekday].update(
+            hours["weekday"] for hours in business_data.get("open_hours", []))
+        names[FoodCategory].update(business_data.get("food_category", []))
+        names[SearchTerm].update(business_data.get("related_search_terms", []))
+        names[Highlight].update(business_data.get("highlights", []))
+        names[Amenity].update(
+            amenity_data["amenity"] for amenity_data in business_data.get("amenities", []))
+    return names
+
+
+async def load_lookup_ids(session: AsyncSession) -> dict[Any, dict[str, int]]:
+    """Load existing name -> id mappings for every lookup table."""
+    lookup_ids = {}
+    for model in LOOKUP_MODELS:
+        result = await session.execute(select(model.name, model.id))
+        lookup_ids[model] = dict(result.all())
+    return lookup_ids
+
 
-    instance = model(**kwargs)
-    session.add(instance)
-    await session.flush()
-    return instance
+async def add_missing_lookup_ids(
+    session: AsyncSession,
+    lookup_ids: dict[Any, dict[str, int]],
+    data: Iterable[dict],
+) -> None:
+    """
+    Upsert names referenced in the data but missing from lookup_ids,
+    with one INSERT ... ON CONFLICT per table, and add their ids to lookup_ids.
+    """
+    needed = collect_lookup_names(data)
+    for model in LOOKUP_MODELS:
+        missing = needed[model] - lookup_ids[model].keys()
+        if missing:
+            table = model.__table__
+            stmt = pg_insert(table)
+            # no-op update instead of DO NOTHING, so that RETURNING also yields
+            # rows inserted concurrently by another upload
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.name],
+                set_={"name": stmt.excluded.name},
+            ).returning(table.c.name, table.c.id)
+            result = await session.execute(
+                stmt, [{"name": name} for name in sorted(missing)])
+            lookup_ids[model].update(result.all())
+
+
+async def copy_rows(session: AsyncSession, model: Any, rows: list[dict]) -> None:
+    """
+    Bulk load rows into the model's table with COPY, which skips per-row statement
+    parsing and planning. Runs on the session's connection, inside its transaction.
+    """
+    columns = list(rows[0])
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        model.__tablename__,
+        records=[tuple(row[column] for column in columns) for row in rows],
+        columns=columns,
+    )
 
 
+@functools.lru_cache(maxsize=512)
 def parse_time(time_str: str) -> time:
-    """Parse time string in format '11:00 AM' or '11:30 PM' to datetime.time object."""
-    try:
-        return datetime.strptime(time_str.strip(), "%I:%M %p").time()
-    except ValueError:
-        return datetime.strptime(time_str.strip(), "%I %p").time()
+    """
+    Parse time string in format '11:00 AM', '11:30 PM' or '11 AM' to datetime.time object.
+    Parsed by hand, since datetime.strptime is slow for such a fixed format.
+    """
+    clock, _, period = time_str.strip().rpartition(" ")
+    hours, _, minutes = clock.partition(":")
+    hour, minute = int(hours), int(minutes or 0)
+    period = period.upper()
+    if not 1 <= hour <= 12 or period not in ("AM", "PM"):
+        raise ValueError(f"Could not parse time from: {time_str}")
+    return time(hour % 12 + (12 if period == "PM" else 0), minute)
 
 
 def parse_hours(hours_str: str) -> list[tuple[time, time]]:
@@ -73,7 +142,7 @@ def parse_hours(hours_str: str) -> list[tuple[time, time]]:
     if hours_str == "Open 24 hours":
         return [(time(0, 0), time(23, 59, 59))]
 
-    time_ranges = re.findall(r"(\d{1,2}:\d{2} [AP]M) - (\d{1,2}:\d{2} [AP]M)", hours_str)
+    time_ranges = HOURS_RE.findall(hours_str)
 
     if not time_ranges:
         raise ValueError(f"Could not parse time ranges from: {hours_str}")
@@ -81,111 +150,127 @@ def parse_hours(hours_str: str) -> list[tuple[time, time]]:
     return [(parse_time(start), parse_time(end)) for start, end in time_ranges]
 
 
-async def push_to_db(data: list[dict]):
-    """Push Yelp business data to database."""
+async def push_businesses(
+    session: AsyncSession,
+    data: Sequence[dict],
+    lookup_ids: dict[Any, dict[str, int]],
+) -> None:
+    """
+    Insert businesses with a single executemany with RETURNING, then COPY
+    the rows of dependent tables collected for them, one COPY per table.
+    """
+    business_rows = [
+        {
+            "name": business_data["name"],
+            "website": business_data.get("website"),
+            "phone_number": business_data.get("phone_number"),
+            "address": business_data.get("address"),
+            "price": business_data.get("price"),
+            "health_score": business_data.get("health_score"),
+        }
+        for business_data in data
+    ]
+    business_table = Business.__table__
+    business_ids = (await session.scalars(
+        business_table.insert().returning(business_table.c.id, sort_by_parameter_order=True),
+        business_rows,
+    )).all()
+
+    open_hours_rows = []
+    food_category_rows = []
+    search_term_rows = []
+    highlight_rows = []
+    amenity_rows = []
+
+    for business_id, business_data in zip(business_ids, data):
+        for hours in business_data.get("open_hours", []):
+            weekday_id = lookup_ids[Weekday][hours["weekday"]]
+            time_ranges = parse_hours(hours["open_hours"])
+
+            open_hours_rows.extend(
+                {
+                    "business_id": business_id,
+                    "weekday_id": weekday_id,
+                    "open_time": open_time,
+                    "close_time": close_time,
+                }
+                for open_time, close_time in time_ranges
+            )
+
+        for category in business_data.get("food_category", []):
+            food_category_rows.append({
+                "business_id": business_id,
+                "food_category_id": lookup_ids[FoodCategory][category],
+            })
+
+        for term in business_data.get("related_search_terms", []):
+            search_term_rows.append({
+                "business_id": business_id,
+                "search_term_id": lookup_ids[SearchTerm][term],
+            })
+
+        for highlight in business_data.get("highlights", []):
+            highlight_rows.append({
+                "business_id": business_id,
+                "highlight_id": lookup_ids[Highlight][highlight],
+            })
+
+        for amenity_data in business_data.get("amenities", []):
+            amenity_rows.append({
+                "business_id": business_id,
+                "amenity_id": lookup_ids[Amenity][amenity_data["amenity"]],
+                "is_available": amenity_data["is_available"],
+            })
+
+    for model, rows in (
+        (OpenHours, open_hours_rows),
+        (BusinessFoodCategory, food_category_rows),
+        (BusinessSearchTerm, search_term_rows),
+        (BusinessHighlight, highlight_rows),
+        (BusinessAmenity, amenity_rows),
+    ):
+        if rows:
+            await copy_rows(session, model, rows)
+
+
+async def push_to_db(data: Iterable[dict], n_skipped: int = 0):
+    """
+    Push Yelp business data to database.
+
+    Data is consumed in chunks of CHUNK_SIZE businesses, so a lazily parsed
+    file never has to be held in memory in full. Each chunk is committed in its
+    own transaction, which bounds transaction size; on failure, only the
+    current chunk is rolled back, and the number of businesses already
+    committed is logged so that the upload can be resumed with --skip.
+    `n_skipped` is the number of businesses skipped at the start of the file.
+    Lookup table ids are loaded once and extended with the names missing in
+    each chunk.
+    """
+    n_uploaded = n_skipped
     try:
         await db.connect()
+        lookup_ids = await load_lookup_ids(db.session)
+
+        for chunk in batched(data, CHUNK_SIZE):
+            await add_missing_lookup_ids(db.session, lookup_ids, chunk)
+            await push_businesses(db.session, chunk, lookup_ids)
+            await db.session.commit()
+            n_uploaded += len(chunk)
+            logger.info("uploaded %s businesses", n_uploaded)
 
-        for c, business_data in enumerate(data):
-            logger.info("processing item %s/%s", c + 1, len(data))
-            business = Business(
-                name=business_data["name"],
-                website=business_data.get("website"),
-                phone_number=business_data.get("phone_number"),
-                address=business_data.get("address"),
-                price=business_data.get("price"),
-                health_score=business_data.get("health_score"),
-            )
-            db.session.add(business)
-            await db.session.flush()
-
-            for hours in business_data.get("open_hours", []):
-                weekday = await get_or_create(
-                    db.session,
-                    Weekday,
-                    name=hours["weekday"],
-                )
-
-                time_ranges = parse_hours(hours["open_hours"])
-
-                for open_time, close_time in time_ranges:
-                    open_hours = OpenHours(
-                        business_id=business.id,
-                        weekday_id=weekday.id,
-                        open_time=open_time,
-                        close_time=close_time,
-                    )
-                    db.session.add(open_hours)
-
-            for category in business_data.get("food_category", []):
-                food_cat = await get_or_create(
-                    db.session,
-                    FoodCategory,
-                    name=category,
-                )
-
-                business_category = BusinessFoodCategory(
-                    business_id=business.id,
-                    food_category_id=food_cat.id,
-                )
-                db.session.add(business_category)
-
-            for term in business_data.get("related_search_terms", []):
-                search_term = await get_or_create(
-                    db.session,
-                    SearchTerm,
-                    name=term,
-                )
-
-                business_term = BusinessSearchTerm(
-                    business_id=business.id,
-                    search_term_id=search_term.id,
-                )
-                db.session.add(business_term)
-
-            for highlight in business_data.get("highlights", []):
-                highlight_obj = await get_or_create(
-                    db.session,
-                    Highlight,
-                    name=highlight,
-                )
-
-                business_highlight = BusinessHighlight(
-                    business_id=business.id,
-                    highlight_id=highlight_obj.id,
-                )
-                db.session.add(business_highlight)
-
-            for amenity_data in business_data.get("amenities", []):
-                amenity = await get_or_create(
-                    db.session,
-                    Amenity,
-                    name=amenity_data["amenity"],
-                )
-
-                business_amenity = BusinessAmenity(
-                    business_id=business.id,
-                    amenity_id=amenity.id,
-                    is_available=amenity_data["is_available"],
-                )
-                db.session.add(business_amenity)
-
-            await db.session.flush()
-
-        await db.session.commit()
         logger.info("Successfully uploaded business data to database")
 
     except Exception:
         await db.session.rollback()
-        logger.error("Failed to upload data to database", exc_info=True)
+        logger.error("Failed to upload data to database after %s businesses, "
+                     "rerun with --skip %s to resume", n_uploaded, n_uploaded, exc_info=True)
 
     finally:
         await db.disconnect()
 
 
-def main(file: Path):
-    data = load_data(file)
-    asyncio.run(push_to_db(data))
+def main(file: Path, skip: int):
+    asyncio.run(push_to_db(islice(iter_data(file), skip, None), n_skipped=skip))
 
 
 if __name__ == "__main__":
@@ -195,5 +280,9 @@ if __name__ == "__main__":
     parser.add_argument(
         "-f", "--file", type=Path, default=Path("../web_scraper/results.ndjson"),
         help="path to file with web-scraping results")
+    parser.add_argument(
+        "-s", "--skip", type=int, default=0,
+        help="number of businesses at the start of the file that are already uploaded "
+             "(logged when an upload fails)")
     args = parser.parse_args()
     main(**vars(args))
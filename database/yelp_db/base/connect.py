@@ -1,13 +1,24 @@
+import asyncio
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
                                     create_async_engine)
 
 
 class Database:
-    def __init__(self, user, password, host, port, db_name):
+    def __init__(self, user, password, host, port, db_name, pool_size=20, max_overflow=10):
         self.connect_parameters = f"{user}:{password}@{host}:{port}/{db_name}"
         self.SYNC_CONNECTION_STRING = f"postgresql+psycopg2://{self.connect_parameters}"
         self.ASYNC_CONNECTION_STRING = f"postgresql+asyncpg://{self.connect_parameters}"
-        self.engine = create_async_engine(self.ASYNC_CONNECTION_STRING)
+        # API handlers use two connections per request (count and page queries)
+        self.engine = create_async_engine(
+            self.ASYNC_CONNECTION_STRING,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+            pool_use_lifo=True,
+        )
         self.async_session = async_sessionmaker(self.engine)
         self.session: AsyncSession = None
 
@@ -19,3 +30,11 @@ class Database:
         if self.session is not None:
             await self.session.close()
             self.session = None
+
+    async def warm_up(self):
+        """Open all pool connections upfront, so first requests don't wait for them"""
+        async def ping():
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+        await asyncio.gather(*(ping() for _ in range(self.engine.pool.size())))
@@ -0,0 +1,41 @@
+"""open hours and category indexes
+
+Revision ID: 8d4c2a6e1f07
+Revises: 5b1e7f3c9a2d
+Create Date: 2026-10-14 11:47:03.518964
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4c2a6e1f07'
+down_revision: Union[str, None] = '5b1e7f3c9a2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_open_hours_weekday_id_open_time_close_time', 'open_hours',
+                        ['weekday_id', 'open_time', 'close_time'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_open_hours_business_id', 'open_hours', ['business_id'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_business_food_category_food_category_id',
+                        'business_food_category', ['food_category_id'],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_business_food_category_food_category_id',
+                      table_name='business_food_category', postgresql_concurrently=True)
+        op.drop_index('ix_open_hours_business_id',
+                      table_name='open_hours', postgresql_concurrently=True)
+        op.drop_index('ix_open_hours_weekday_id_open_time_close_time',
+                      table_name='open_hours', postgresql_concurrently=True)
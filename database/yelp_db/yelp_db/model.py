@@ -2,7 +2,9 @@
 this module describes tables in yelp_db
 """
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Time
+from sqlalchemy import (Boolean, Column, ForeignKey, Index, Integer, String,
+                        Time)
+from sqlalchemy.orm import relationship
 from yelp_db.yelp_db.connect import Base
 
 
@@ -16,9 +18,25 @@ class Business(Base):
     price = Column(String, nullable=True)
     health_score = Column(String, nullable=True)
 
+    # lazy="raise" so that relationships are only available when eager loaded
+    open_hours = relationship("OpenHours", lazy="raise")
+    food_categories = relationship(
+        "FoodCategory", secondary="business_food_category", lazy="raise", viewonly=True)
+    search_terms = relationship(
+        "SearchTerm", secondary="business_search_term", lazy="raise", viewonly=True)
+    highlights = relationship(
+        "Highlight", secondary="business_highlight", lazy="raise", viewonly=True)
+    amenities = relationship(
+        "Amenity", secondary="business_amenity", lazy="raise", viewonly=True)
+
 
 class OpenHours(Base):
     __tablename__ = "open_hours"
+    __table_args__ = (
+        Index("ix_open_hours_weekday_id_open_time_close_time",
+              "weekday_id", "open_time", "close_time"),
+        Index("ix_open_hours_business_id", "business_id"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     business_id = Column(Integer, ForeignKey("business.id"), nullable=False)
     open_time = Column(Time, nullable=False)
@@ -29,35 +47,38 @@ class OpenHours(Base):
 class Weekday(Base):
     __tablename__ = "weekday"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, unique=True, index=True)
 
 
 class FoodCategory(Base):
     __tablename__ = "food_category"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, unique=True, index=True)
 
 
 class SearchTerm(Base):
     __tablename__ = "search_term"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, unique=True, index=True)
 
 
 class Highlight(Base):
     __tablename__ = "highlight"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, unique=True, index=True)
 
 
 class Amenity(Base):
     __tablename__ = "amenity"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, unique=True, index=True)
 
 
 class BusinessFoodCategory(Base):
     __tablename__ = "business_food_category"
+    __table_args__ = (
+        Index("ix_business_food_category_food_category_id", "food_category_id"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     business_id = Column(Integer, ForeignKey("business.id"), nullable=False)
     food_category_id = Column(Integer, ForeignKey("food_category.id"), nullable=False)
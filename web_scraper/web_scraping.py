@@ -1,22 +1,23 @@
 import asyncio
+import hashlib
 import html
-import json
 import logging
 import random
 import re
 import urllib.parse
-from contextlib import asynccontextmanager
-from io import StringIO
+from collections.abc import Iterator
+from http.cookies import SimpleCookie
 from pathlib import Path
+from typing import BinaryIO
 
 import aiohttp
-import pandas as pd
+import lxml.html
+import orjson
 from aiohttp import ClientTimeout
-from bs4 import BeautifulSoup
-from jsonpath_ng import parse
+from lxml import etree
 from pydantic import BaseModel, Field
 from rich.logging import RichHandler
-from tenacity import retry, stop_after_attempt, wait_random
+from tenacity import RetryCallState, retry, stop_after_attempt, wait_random
 
 FORMAT = "%(message)s"
 logging.basicConfig(
@@ -24,64 +25,119 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SEARCH_CACHE_DIR = Path("cache/search")
+# only what the pinned aiohttp can decode (br through brotli), it has no zstd support
+ACCEPT_ENCODING = "gzip, deflate, br"
+CAPTCHA_SENTINEL = b'src="https://ct.captcha-delivery.com/i.js"'
+BIZID_RE = re.compile(rb'"bizId"\s*:\s*"([^"]+)"')
+PRICE_RE = re.compile(r"^\${1,4}$")
+HEALTH_SCORE_RE = re.compile(r"^[A-Z]$")
+HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")  # pages are fetched as raw bytes
+H1_XP = etree.XPath("//h1")
+WEBSITE_XP = etree.XPath(
+    '//p[text()="Business website"]/following-sibling::*[1]//a/@href', smart_strings=False)
+PHONE_XP = etree.XPath('//p[text()="Phone number"]/following-sibling::*[1]')
+ADDRESS_XP = etree.XPath('//a[text()="Get Directions"]/../following-sibling::*[1]')
+HEALTH_SCORE_XP = etree.XPath('//a[text()="Health Score"]/../following-sibling::*[1]')
+CATEGORIES_XP = etree.XPath('//*[@data-testid="BizHeaderCategory"]')
+PHOTO_HEADER_TEXT_XP = etree.XPath(
+    '(//*[@data-testid="photoHeader"])[1]//text()', smart_strings=False)
+HOURS_TABLE_XP = etree.XPath(
+    '//*[contains(concat(" ", normalize-space(@class)), " hours-table_")]')
+HOURS_ROWS_XP = etree.XPath(".//tr[not(ancestor::thead)]")
+HOURS_CELLS_XP = etree.XPath("./td|./th")
+AMENITIES_SECTION_XP = etree.XPath('//section[@aria-label="Amenities and More"]')
+APOLLO_STATE_XP = etree.XPath('//script[@type="application/json"][@data-apollo-state]')
+# entities Yelp escapes in the Apollo state; &amp; is replaced last
+APOLLO_STATE_ENTITIES = (
+    (b"&quot;", b'"'), (b"&#39;", b"'"), (b"&#x27;", b"'"), (b"&lt;", b"<"), (b"&gt;", b">"),
+)
+AMENITIES_KEY = 'organizedProperties({"clientPlatform":"WWW"})'
+HIGHLIGHTS_KEY = "businessHighlights"
+RELATED_SEARCHES_KEY = 'associatedSearchesV2({"type":"people_found_biz_search_type_v1"})'
+N_RETRIES = 5
+
+
+def _log_retry(retry_state: RetryCallState) -> None:
+    logger.warning(
+        "Retry %s/%s in %s seconds due to %s",
+        retry_state.attempt_number,
+        N_RETRIES,
+        retry_state.next_action.sleep,
+        retry_state.outcome.exception(),
+    )
 
-def retry_with_logging(
-        n_retries: int = 5,
-        min_delay: int = 2,
-        max_delay: int = 8):
-    """
-    Decorator for retrying a function call with logging.
 
-    Retries a function up to `n_retries` times, with a random delay
-    between `min_delay` and `max_delay` seconds before each retry.
+# Retries a request up to N_RETRIES times, with a random 2-8 s delay and a log line before each
+retry_with_logging = retry(
+    stop=stop_after_attempt(N_RETRIES),
+    wait=wait_random(min=2, max=8),
+    before_sleep=_log_retry,
+)
+
+
+def create_session(headers: dict | None, max_connections: int) -> aiohttp.ClientSession:
+    """
+    Creates one session shared by all requests, so that connections are kept
+    alive and reused. User-Agent and proxy are rotated per request instead.
+    No cookie jar is kept, as it would mix cookies of different identities,
+    requests that need cookies pass them explicitly.
+    The connector limit only caps the number of open sockets, callers bound
+    their own concurrency, since time spent waiting for a pooled connection
+    counts against the request timeout.
     """
-    return retry(
-        stop=stop_after_attempt(n_retries),
-        wait=wait_random(min=min_delay, max=max_delay),
-        before_sleep=lambda retry_state: logger.warning(
-            "Retry %s/%s in %s seconds due to %s",
-            retry_state.attempt_number,
-            n_retries,
-            retry_state.next_action.sleep,
-            retry_state.outcome.exception(),
-        ),
+    connector = aiohttp.TCPConnector(
+        limit=max_connections,
+        limit_per_host=max_connections,
+        ttl_dns_cache=300,
+        enable_cleanup_closed=True,
+    )
+    return aiohttp.ClientSession(
+        headers=headers,
+        connector=connector,
+        cookie_jar=aiohttp.DummyCookieJar(),
+        timeout=ClientTimeout(total=30),
     )
 
 
-async def create_session(headers: dict | None = None,
-                         user_agents_list: list[str] | None = None,
-                         proxies_list: list[str] | None = None) -> aiohttp.ClientSession:
-    if user_agents_list:
-        if headers:
-            headers.update({"User-Agent": random.choice(user_agents_list)})
-        else:
-            headers = {"User-Agent": random.choice(user_agents_list)}
+def pick_proxy(proxies_list: list[str] | None) -> str | None:
+    if not proxies_list:
+        return None
+    proxy = random.choice(proxies_list).strip()
+    if not proxy.startswith("http://") and not proxy.startswith("https://"):
+        proxy = "http://" + proxy
+    return proxy
 
-    proxy = None
-    if proxies_list:
-        proxy = random.choice(proxies_list)
-        if not proxy.startswith("http://") and not proxy.startswith("https://"):
-            proxy = "http://" + proxy
 
-    timeout = ClientTimeout(total=30)
+def pick_user_agent(user_agents_list: list[str] | None) -> dict:
+    if not user_agents_list:
+        return {}
+    return {"User-Agent": random.choice(user_agents_list)}
 
-    return aiohttp.ClientSession(
-        headers=headers,
-        timeout=timeout,
-        proxy=proxy if proxies_list else None,
-    )
+
+def _iter_json_dicts(json_data: dict | list | None) -> Iterator[dict]:
+    """
+    Yields all dictionaries nested in parsed JSON data, in document order.
+    """
+    stack = [json_data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            stack.extend(reversed(item.values()))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
 
 
-@asynccontextmanager
-async def get_session(headers, user_agents, proxies_list):
-    session = await create_session(headers, user_agents, proxies_list)
-    try:
-        yield session
-    finally:
-        await session.close()
+def _first_by_key(json_data: dict | list | None, key: str):
+    """
+    Returns the value of the first occurrence of `key` in parsed JSON data,
+    or None if the key is not present anywhere.
+    """
+    return next((item[key] for item in _iter_json_dicts(json_data) if key in item), None)
 
 
-def extract_urls_from_search_page(json_text: str) -> list[dict[str, str]]:
+def extract_urls_from_search_page(json_body: bytes) -> list[dict[str, str]]:
     """
     Extracts business URLs and metadata from a Yelp search result JSON.
 
@@ -91,89 +147,133 @@ def extract_urls_from_search_page(json_text: str) -> list[dict[str, str]]:
     Raises:
         ValueError: If a captcha is detected or the page fails to load.
     """
-    business_pattern = re.findall(
-        r'{\s*"bizId"\s*:\s*"([^"]+)"\s*,\s*"searchResultBusiness"\s*:\s*{.*?'
-        r'"ranking"\s*:\s*(\d+).*?"isAd"\s*:\s*(true|false).*?"name"\s*:\s*"([^"]+).*?'
-        r'"businessUrl"\s*:\s*"([^"]+)"',
-        json_text, re.DOTALL,
-    )
+    if CAPTCHA_SENTINEL in json_body:
+        raise ValueError("Encountered captcha")
+    try:
+        json_data = orjson.loads(json_body)
+    except orjson.JSONDecodeError:  # e.g. captcha page instead of JSON
+        json_data = None
 
     businesses = []
-    for match in business_pattern:
-        biz_id, ranking, is_ad, name, business_url = match
+    for item in _iter_json_dicts(json_data):
+        search_result = item.get("searchResultBusiness")
+        if "bizId" not in item or not isinstance(search_result, dict):
+            continue
+        if search_result.get("isAd"):
+            continue
         businesses.append({
-            "bizId": biz_id,
-            "ranking": int(ranking),
-            "isAd": is_ad == "true",
-            "name": name,
-            "businessUrl": business_url,
+            "bizId": item["bizId"],
+            "ranking": int(search_result["ranking"]),
+            "name": search_result["name"],
+            "businessUrl": ("https://www.yelp.com"
+                            + search_result["businessUrl"].rsplit("?", 1)[0]),
         })
 
-    businesses = [b for b in businesses if not b["isAd"]]
-    for b in businesses:
-        b["businessUrl"] = "https://www.yelp.com" + b["businessUrl"].rsplit("?", 1)[0]
-        b.pop("isAd")
     if not businesses:
-        if 'src="https://ct.captcha-delivery.com/i.js"' in json_text:
-            raise ValueError("Encountered captcha")
         raise ValueError("Page didn't load successfully")
     return businesses
 
 
-@retry_with_logging()
+def _append_ndjson(f: BinaryIO, items: list[dict]) -> None:
+    f.write(b"".join(orjson.dumps(item) + b"\n" for item in items))
+    f.flush()
+
+
+async def write_ndjson(outfile: Path, queue: asyncio.Queue) -> None:
+    """
+    Appends every item put on `queue` to `outfile` as one JSON line, until
+    None is received. The file stays open for the whole run. Whatever has
+    queued up meanwhile is written and flushed in a worker thread, so disk
+    I/O does not block the event loop and an interrupted run can be resumed.
+    """
+    with outfile.open("ab") as f:
+        finished = False
+        while not finished:
+            items = [await queue.get()]
+            while not queue.empty():
+                items.append(queue.get_nowait())
+            if items[-1] is None:
+                items.pop()
+                finished = True
+            if items:
+                await asyncio.to_thread(_append_ndjson, f, items)
+
+
+async def _get_bytes(session: aiohttp.ClientSession, url: str, **kwargs) -> bytes:
+    async with session.get(url, **kwargs) as response:
+        return await response.read()
+
+
+async def _get_cookies(session: aiohttp.ClientSession, url: str, **kwargs) -> SimpleCookie:
+    async with session.get(url, **kwargs) as response:
+        return response.cookies
+
+
+async def _get_json(session: aiohttp.ClientSession, url: str, **kwargs) -> dict:
+    async with session.get(url, **kwargs) as response:
+        return await response.json(loads=orjson.loads)
+
+
+@retry_with_logging
 async def scrape_single_search_page(
+    session: aiohttp.ClientSession,
     find_desc: str,
     find_loc: str,
     start: int,
-    headers: dict,
     user_agents: list[str],
     proxies_list: list[str],
     timeout: int,
 ) -> list[dict] | None:
     await asyncio.sleep(random.uniform(0, 2))
-    async with get_session(headers, user_agents, proxies_list) as session:
-        # First request to get cookies/session data
-        async with session.get(
-            "https://www.yelp.com/search",
-            params={"find_desc": find_desc, "find_loc": find_loc},
+    # same identity for all requests, as they belong to one search
+    proxy = pick_proxy(proxies_list)
+    user_agent = pick_user_agent(user_agents)
+    search_params = {"find_desc": find_desc, "find_loc": find_loc}
+
+    async def get_snippet(headers: dict, cookies: SimpleCookie | None = None) -> bytes:
+        return await _get_bytes(
+            session,
+            "https://www.yelp.com/search/snippet",
+            params={**search_params, "start": start},
+            headers=headers,
+            cookies=cookies,
+            proxy=proxy,
             timeout=timeout,
-        ) as response:
-            url = response.url
-            await response.text()
+        )
 
-        headers = {
-            "accept": "application/json",
-            "accept-language": "en;q=0.6",
-            "content-type": "application/json",
-            "referer": url,
-            "x-requested-with": "XMLHttpRequest",
-            "Accept-Encoding": "gzip, deflate",
-        }
+    body = await get_snippet({
+        **user_agent,
+        "Referer": "https://www.yelp.com/search?" + urllib.parse.urlencode(search_params),
+    })
 
-        # Actual search request
-        await asyncio.sleep(random.uniform(2, 5))
-        async with session.get(
-            "https://www.yelp.com/search/snippet",
-            params={"find_desc": find_desc, "find_loc": find_loc, "start": start},
-            headers={"Referer": "https://www.yelp.com/"},
+    if CAPTCHA_SENTINEL in body:
+        # Get cookies/session data from the search page first, then try again
+        cookies = await _get_cookies(
+            session,
+            "https://www.yelp.com/search",
+            params=search_params,
+            headers=user_agent,
+            proxy=proxy,
             timeout=timeout,
-        ) as response:
-            text = await response.text()
-            if "excessivePaging" in text:  # meaning that the relevant search pages ended
-                return None
-            return extract_urls_from_search_page(text)
+        )
+        await asyncio.sleep(random.uniform(2, 5))
+        body = await get_snippet({**user_agent, "Referer": "https://www.yelp.com/"}, cookies)
+
+    if b"excessivePaging" in body:  # meaning that the relevant search pages ended
+        return None
+    return extract_urls_from_search_page(body)
 
 
 async def scrape_search_pages(
+    session: aiohttp.ClientSession,
     find_desc: str,
     find_loc: str,
-    headers: dict,
     user_agents: list[str],
     proxies_list: list[str],
     timeout: int,
     outfile: Path,
     batch_size: int = 10,
-) -> None:
+) -> Path:
     """
     Scrapes multiple Yelp search result pages to gather business listings.
 
@@ -184,49 +284,65 @@ async def scrape_search_pages(
         find_desc: The type of business to search for (e.g., "Restaurants").
         find_loc: The location for the search (e.g., "Las Vegas").
         outfile: Path to the file where business listings will be saved.
-        batch_size: Number of pages to scrape concurrently
+                 It is only created once every page was scraped and the end
+                 of the search was reached, so it can be reused as a cache.
+        batch_size: Number of pages kept in flight at once
                     (each page includes 10 entries).
-    """
-    start = 0
-    while True:
-        logger.info("Processing batch starting from %s", start)
-
-        tasks = [
-            asyncio.create_task(
-                scrape_single_search_page(
-                    find_desc=find_desc,
-                    find_loc=find_loc,
-                    start=start + (i * 10),
-                    headers=headers,
-                    user_agents=user_agents,
-                    proxies_list=proxies_list,
-                    timeout=timeout,
-                ),
-            )
-            for i in range(batch_size)
-        ]
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        empty_page_found = False
-        for result in results:
-            if isinstance(result, Exception):
-                logger.error("A request failed: %s", result, exc_info=True)
-                continue
-
-            if result is None:  # None is returned only if excessivePaging is in response text
-                empty_page_found = True
-                break
+    Returns:
+        Path to the scraped listing. If some pages failed, this is the partial
+        listing in `outfile` with a `.part` suffix, so the next run searches again.
+    """
+    partfile = outfile.with_name(outfile.name + ".part")
+    partfile.unlink(missing_ok=True)
+    queue = asyncio.Queue()
+    writer = asyncio.create_task(write_ndjson(partfile, queue))
+    pending = set()
+    n_failed = 0
+    try:
+        next_start = 0
+        end_found = False
+        while pending or not end_found:
+            # keep batch_size pages in flight until the end of the search is found
+            while not end_found and len(pending) < batch_size:
+                logger.info("Processing page starting from %s", next_start)
+                pending.add(asyncio.create_task(
+                    scrape_single_search_page(
+                        session=session,
+                        find_desc=find_desc,
+                        find_loc=find_loc,
+                        start=next_start,
+                        user_agents=user_agents,
+                        proxies_list=proxies_list,
+                        timeout=timeout,
+                    ),
+                ))
+                next_start += 10
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if (exc := task.exception()) is not None:
+                    logger.error("A request failed: %s", exc, exc_info=exc)
+                    n_failed += 1
+                    continue
+
+                if (result := task.result()) is None:  # only if excessivePaging is in response
+                    end_found = True
+                    continue
 
-            with outfile.open("a") as f:
                 for business in result:
-                    json.dump(business, f)
-                    f.write("\n")
-
-        if empty_page_found:
-            break
+                    queue.put_nowait(business)
+    finally:
+        for task in pending:
+            task.cancel()
+        await queue.put(None)
+        await writer
 
-        start += batch_size * 10
+    if n_failed:
+        logger.warning(f"{n_failed} search pages failed, listing in {partfile} is incomplete")
+        return partfile
+    partfile.replace(outfile)
+    return outfile
 
 
 class BusinessInfo(BaseModel):
@@ -247,53 +363,54 @@ class BusinessInfo(BaseModel):
     related_search_terms: list[str]
 
 
-def _get_website(soup: BeautifulSoup) -> str:
+def _get_website(tree: lxml.html.HtmlElement) -> str:
     """
     Extracts the business website URL from the Yelp business page.
 
     Returns:
         The website URL as a string if available, otherwise None.
     """
-    if not soup.find("p", string="Business website"):
+    if not (hrefs := WEBSITE_XP(tree)):
         return None
-    link_tag = soup.find("p", string="Business website").find_next_sibling().find("a")
-    parsed_url = urllib.parse.parse_qs(urllib.parse.urlparse(link_tag["href"]).query)
+    parsed_url = urllib.parse.parse_qs(urllib.parse.urlparse(hrefs[0]).query)
     return parsed_url.get("url", [None])[0]
 
 
-def _process_hours_table(hours_table: pd.DataFrame) -> list[dict[str, str]]:
-    hours_table = hours_table.dropna(how="all").iloc[:, :2]
-    if hours_table.columns[0].startswith("Unnamed") and hours_table.columns[1].startswith("Unnamed"):
-        hours_table.columns = ["weekday", "open_hours"]
-    else:
-        raise ValueError("First two columns already have names!")
-    return hours_table.to_dict(orient="records")
-
+def _get_sibling_text(tree: lxml.html.HtmlElement, xpath: etree.XPath) -> str | None:
+    return str(elements[0].text_content()) if (elements := xpath(tree)) else None
 
-def _get_open_hours(soup: BeautifulSoup) -> list[dict[str, str]]:
-    hours_table = soup.find(class_=re.compile("^hours-table_"))
-    try:
-        hours_table = pd.read_html(StringIO(str(hours_table)))[0]
-        return _process_hours_table(hours_table)
 
-    except ValueError:
+def _get_open_hours(tree: lxml.html.HtmlElement) -> list[dict[str, str]]:
+    if not (hours_tables := HOURS_TABLE_XP(tree)):
         return []
+    open_hours = []
+    for row in HOURS_ROWS_XP(hours_tables[0]):
+        cells = [cell.text_content().strip() for cell in HOURS_CELLS_XP(row)]
+        if len(cells) < 2 or not any(cells[:2]):
+            continue
+        open_hours.append({"weekday": cells[0], "open_hours": cells[1]})
+    return open_hours
 
 
-def _extract_script_json(soup: BeautifulSoup) -> dict | None:
+def _extract_script_json(tree: lxml.html.HtmlElement) -> dict | None:
     """
     Extracts and parses JSON data from the embedded `<script>` tag on the page.
 
     Returns:
         A dictionary containing Yelp's Apollo state JSON data, if available.
     """
-    script_tag = soup.find("script", {"type": "application/json", "data-apollo-state": True})
-    if script_tag:
-        return json.loads(html.unescape(script_tag.string)[4:-3])
-    return None
+    script_tags = APOLLO_STATE_XP(tree)
+    if not script_tags or not script_tags[0].text:
+        return None
+    raw = script_tags[0].text.encode()[4:-3]  # strip the <!-- --> wrapper
+    for entity, char in APOLLO_STATE_ENTITIES:
+        raw = raw.replace(entity, char)
+    if raw.count(b"&") != raw.count(b"&amp;"):  # some other entity is left, decode in full
+        return orjson.loads(html.unescape(raw.decode()))
+    return orjson.loads(raw.replace(b"&amp;", b"&"))
 
 
-def _get_amenities(soup: BeautifulSoup, json_data: dict | None) -> list[dict[str, bool]]:
+def _get_amenities(tree: lxml.html.HtmlElement, json_data: dict | None) -> list[dict[str, bool]]:
     """
     Extracts business amenities from Yelp's JSON data.
 
@@ -303,119 +420,122 @@ def _get_amenities(soup: BeautifulSoup, json_data: dict | None) -> list[dict[str
     Returns:
         A list of dictionaries with `amenity` name and `is_available` boolean.
     """
-    if not soup.select_one('section[aria-label="Amenities and More"]') or not json_data:
+    if not AMENITIES_SECTION_XP(tree) or not json_data:
         return []
 
-    jsonpath_expr = parse(r'$..["organizedProperties({\"clientPlatform\":\"WWW\"})"]')
-    matches = [match.value for match in jsonpath_expr.find(json_data)]
-    if matches[0]:
+    if organized_properties := _first_by_key(json_data, AMENITIES_KEY):
         return [{"amenity": amenity["displayText"], "is_available": amenity["isActive"]}
-                for amenity in matches[0][0]["properties"]]
+                for amenity in organized_properties[0]["properties"]]
     return []
 
 
 def _get_highlights(json_data: dict) -> list[str]:
-    jsonpath_expr = parse(r'$..["businessHighlights"]')
-    matches = [match.value for match in jsonpath_expr.find(json_data)]
-    if matches:
-        return [highlight["title"] for highlight in matches[0]]
+    if highlights := _first_by_key(json_data, HIGHLIGHTS_KEY):
+        return [highlight["title"] for highlight in highlights]
     return []
 
 
 def _get_related_search_terms(json_data: dict | None) -> list[str]:
     if not json_data:
         return []
-    jsonpath_expr = parse(
-        r'$..["associatedSearchesV2({\"type\":\"people_found_biz_search_type_v1\"})"]')
-    matches = [match.value for match in jsonpath_expr.find(json_data)]
-    if matches[0]:
-        return [item["searchPhrase"] for item in matches[0]]
+    if related_searches := _first_by_key(json_data, RELATED_SEARCHES_KEY):
+        return [item["searchPhrase"] for item in related_searches]
     return []
 
 
 def extract_data_from_business_page(
-    webpage_html: str,
+    webpage_html: bytes,
     yelp_biz_data: dict,
 ) -> BusinessInfo:
     """
     Process pre-fetched webpage HTML and business data to extract business information.
     """
-    soup = BeautifulSoup(webpage_html, "lxml")
-    if not soup.select_one("h1"):
-        if 'src="https://ct.captcha-delivery.com/i.js"' in webpage_html:
-            raise ValueError("Encountered captcha")
+    if CAPTCHA_SENTINEL in webpage_html:
+        raise ValueError("Encountered captcha")
+    tree = lxml.html.fromstring(webpage_html, parser=HTML_PARSER)
+    if not (h1 := H1_XP(tree)):
         raise ValueError("The page contents didn't load successfully")
 
-    script_json = _extract_script_json(soup)
-
-    return BusinessInfo(
-        name=soup.select_one("h1").text,
-        website=_get_website(soup),
-        phone_number=(None if not (pn_element := soup.find("p", string="Phone number"))
-                      else (pn_element.find_next_sibling().text)),
-        open_hours=_get_open_hours(soup),
-        address=(None if not (gd_element := soup.find("a", string="Get Directions"))
-                 else gd_element.parent.find_next_sibling().text),
-        food_category=[el.text.strip().replace(",", "")
-                       for el in soup.select("[data-testid='BizHeaderCategory']")],
-        price=(soup.select_one('[data-testid="photoHeader"]')
-               .find(string=re.compile(r"^\${1,4}$"))),
-        health_score=(None if not (hs := soup.find("a", string="Health Score"))
-                      else hs.parent.find_next_sibling().text),
-        amenities=_get_amenities(soup, script_json),
+    script_json = _extract_script_json(tree)
+    health_score = _get_sibling_text(tree, HEALTH_SCORE_XP)
+    if health_score is not None and not HEALTH_SCORE_RE.match(health_score):
+        raise ValueError(f"Unexpected health score: {health_score!r}")
+
+    # every field is built to match the model above, so validation is skipped
+    return BusinessInfo.model_construct(
+        name=str(h1[0].text_content()),
+        website=_get_website(tree),
+        phone_number=_get_sibling_text(tree, PHONE_XP),
+        open_hours=_get_open_hours(tree),
+        address=_get_sibling_text(tree, ADDRESS_XP),
+        food_category=[el.text_content().strip().replace(",", "")
+                       for el in CATEGORIES_XP(tree)],
+        price=next((text for text in PHOTO_HEADER_TEXT_XP(tree) if PRICE_RE.search(text)), None),
+        health_score=health_score,
+        amenities=_get_amenities(tree, script_json),
         highlights=_get_highlights(yelp_biz_data),
         related_search_terms=_get_related_search_terms(script_json),
     )
 
 
-@retry_with_logging()
+@retry_with_logging
 async def scrape_single_business(
+    session: aiohttp.ClientSession,
     business: dict,
-    headers: dict,
     user_agents: list[str],
     proxies_list: list[str],
     timeout: int,
-    outfile: Path,
+    queue: asyncio.Queue,
     semaphore: asyncio.Semaphore,
 ) -> None:
-    async with semaphore, get_session(headers, user_agents, proxies_list) as session:
+    async with semaphore:
         url = business["businessUrl"]
+        # same identity for both requests, as they belong to one business page
+        proxy = pick_proxy(proxies_list)
+        user_agent = pick_user_agent(user_agents)
 
         await asyncio.sleep(random.uniform(0, 5))
 
-        async with session.get(url, timeout=timeout) as response:
-            webpage_html = await response.text()
-
         headers = {
+            **user_agent,
             "accept": "application/json",
             "accept-language": "en;q=0.6",
             "content-type": "application/json",
             "referer": url,
             "x-requested-with": "XMLHttpRequest",
-            "Accept-Encoding": "gzip, deflate",
+            "Accept-Encoding": ACCEPT_ENCODING,
         }
 
-        # Get business data
-        async with session.get(
-            f"https://www.yelp.com/biz/{business['bizId']}/props",
-            headers=headers,
-            timeout=timeout,
-        ) as response:
-            yelp_biz_data = await response.json()
+        # The props request only needs bizId, so both are sent at once
+        requests = [
+            asyncio.create_task(
+                _get_bytes(session, url, headers=user_agent, proxy=proxy, timeout=timeout)),
+            asyncio.create_task(_get_json(
+                session,
+                f"https://www.yelp.com/biz/{business['bizId']}/props",
+                headers=headers,
+                proxy=proxy,
+                timeout=timeout,
+            )),
+        ]
+        try:
+            webpage_html, yelp_biz_data = await asyncio.gather(*requests)
+        except BaseException:
+            # don't leave the other request running into the next retry
+            for request in requests:
+                request.cancel()
+            raise
 
         business_info = extract_data_from_business_page(webpage_html, yelp_biz_data)
         business_data = {k: v for k, v in business.items() if k in ("bizId", "ranking")}
-        result = business_data | business_info.model_dump()
+        result = business_data | dict(business_info)
 
-        async with asyncio.Lock():
-            with outfile.open("a") as f:
-                json.dump(result, f)
-                f.write("\n")
+        await queue.put(result)
 
 
 async def scrape_businesses(
+    session: aiohttp.ClientSession,
     businesses_to_scrape: list[dict],
-    headers: dict,
     user_agents: list[str],
     proxies_list: list[str],
     timeout: int,
@@ -433,21 +553,28 @@ async def scrape_businesses(
         concurrency: Number of business pages to scrape in parallel.
     """
     semaphore = asyncio.Semaphore(concurrency)
+    queue = asyncio.Queue()
+    writer = asyncio.create_task(write_ndjson(outfile, queue))
 
     tasks = [
         scrape_single_business(
+            session=session,
             business=business,
-            headers=headers,
             user_agents=user_agents,
             proxies_list=proxies_list,
             timeout=timeout,
-            outfile=outfile,
+            queue=queue,
             semaphore=semaphore,
         )
         for business in businesses_to_scrape
     ]
 
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await queue.put(None)
+        await writer
+
     for result in results:
         if isinstance(result, Exception):
             logger.error("Scraping failed: %s", result, exc_info=True)
@@ -463,7 +590,7 @@ USER_AGENTS = [
 
 HEADERS = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-    "Accept-Encoding": "gzip, deflate, br, zstd",
+    "Accept-Encoding": ACCEPT_ENCODING,
     "Accept-Language": "en;q=0.6",
     "Connection": "keep-alive",
     "Referer": "https://www.google.com/",
@@ -478,6 +605,7 @@ async def main(
     headers: dict[str, str] | None = None,
     user_agents: list[str] | None = None,
     proxies_list: list[str] | None = None,
+    concurrency: int = 20,
 ) -> None:
     """
     Scrapes Yelp business data for given search criteria and location.
@@ -494,44 +622,51 @@ async def main(
         user_agents = USER_AGENTS
 
     outfile = Path(outfile)
-    tmpfile = Path("businesses.ndjson")
-
-    # Obtain all business links from search
-    if not tmpfile.exists():
-        logger.info("Scraping search results")
-        await scrape_search_pages(
-            find_desc=find_desc,
-            find_loc=find_loc,
-            headers=headers,
-            user_agents=user_agents,
-            proxies_list=proxies_list,
-            timeout=timeout,
-            outfile=tmpfile,
-            batch_size=10,
-        )
+    # search results are cached per query, so repeated runs skip the search phase
+    search_key = hashlib.sha1(f"{find_desc}|{find_loc}".encode()).hexdigest()
+    tmpfile = SEARCH_CACHE_DIR / f"{search_key}.ndjson"
+    tmpfile.parent.mkdir(parents=True, exist_ok=True)
+
+    # each business page is fetched together with its props
+    async with create_session(headers, max_connections=2 * concurrency) as session:
+        # Obtain all business links from search
+        search_results = tmpfile
+        if not tmpfile.exists():
+            logger.info("Scraping search results")
+            search_results = await scrape_search_pages(
+                session=session,
+                find_desc=find_desc,
+                find_loc=find_loc,
+                user_agents=user_agents,
+                proxies_list=proxies_list,
+                timeout=timeout,
+                outfile=tmpfile,
+                batch_size=10,
+            )
 
-    # Scrape only businesses not yet scraped
-    with tmpfile.open() as f:
-        businesses_to_scrape = [json.loads(line) for line in f]
+        # Scrape only businesses not yet scraped
+        with search_results.open("rb") as f:
+            businesses_to_scrape = [orjson.loads(line) for line in f]
 
-    if outfile.exists():
-        with outfile.open() as f:
-            businesses_scraped = {json.loads(line)["bizId"] for line in f}
-        businesses_to_scrape = [b for b in businesses_to_scrape
-                                if b["bizId"] not in businesses_scraped]
+        if outfile.exists():
+            with outfile.open("rb") as f:
+                businesses_scraped = {match.group(1).decode() for line in f
+                                      if (match := BIZID_RE.search(line))}
+            businesses_to_scrape = [b for b in businesses_to_scrape
+                                    if b["bizId"] not in businesses_scraped]
 
-    if businesses_to_scrape:
-        logger.info("Scraping individual business pages")
+        if businesses_to_scrape:
+            logger.info("Scraping individual business pages")
 
-    await scrape_businesses(
-        businesses_to_scrape=businesses_to_scrape,
-        headers=headers,
-        user_agents=user_agents,
-        proxies_list=proxies_list,
-        timeout=timeout,
-        outfile=outfile,
-        concurrency=20,
-    )
+        await scrape_businesses(
+            session=session,
+            businesses_to_scrape=businesses_to_scrape,
+            user_agents=user_agents,
+            proxies_list=proxies_list,
+            timeout=timeout,
+            outfile=outfile,
+            concurrency=concurrency,
+        )
 
 if __name__ == "__main__":
     with Path("proxies_list.txt").open() as f: